@@ -1,35 +1,134 @@
 """LangGraph agent implementation with decision node for weather vs RAG routing."""
-from typing import Literal, TypedDict, Annotated
+import asyncio
+import re
+import string
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from dataclasses import dataclass, field
+from typing import Iterator, Literal, Optional, Tuple
+import numpy as np
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from weather_service import WeatherService
 from rag_service import RAGService
-from config import LLM_MODEL, OPENAI_API_KEY
+from semantic_cache import SemanticCache
+from config import (
+    INTENT_SIMILARITY_THRESHOLD,
+    LANGSMITH_TRACING_ENABLED,
+    WEATHER_MAX_CONCURRENCY,
+    RAG_MAX_CONCURRENCY,
+)
 
 
-class AgentState(TypedDict):
-    """State schema for the LangGraph agent."""
-    messages: Annotated[list, "list of messages"]
+# Keywords that suggest weather query
+_WEATHER_KEYWORDS = (
+    "weather", "temperature", "forecast", "humidity",
+    "wind", "rain", "snow", "climate", "temperature in",
+    "weather in", "how's the weather", "what's the weather"
+)
+# Whole-word hits resolve with a set lookup; the compiled alternation is the
+# single C-level fallback scan for phrases and inflections such as "raining"
+_WEATHER_WORDS = frozenset(keyword for keyword in _WEATHER_KEYWORDS if " " not in keyword)
+_WEATHER_RE = re.compile("|".join(re.escape(keyword) for keyword in _WEATHER_KEYWORDS))
+
+# One C-level lookup table pass lowercases ASCII and turns punctuation (except the
+# apostrophe in "what's") into spaces, so "weather?" splits into a clean token
+_ROUTING_TABLE = str.maketrans(
+    string.ascii_uppercase + string.punctuation.replace("'", ""),
+    string.ascii_lowercase + " " * (len(string.punctuation) - 1)
+)
+
+_CITY_PREPOSITIONS = ("in", "for", "at")
+_CITY_KEYWORDS = ("weather", "temperature")
+_MULTIWORD_CITY_PREFIXES = frozenset({"new", "san", "los", "saint", "st"})
+# Known prefixes keep multi-word cities together
+_CITY_NAME = rf"((?:{'|'.join(sorted(_MULTIWORD_CITY_PREFIXES))})\s+\w+|\w+)"
+
+# Tried in priority order, not by position: "in" beats "for" beats "at" wherever
+# they occur, and a weather keyword is only a fallback ("weather London")
+_CITY_RES = tuple(
+    re.compile(rf"\b{word}\s+{_CITY_NAME}", re.IGNORECASE)
+    for word in _CITY_PREPOSITIONS + _CITY_KEYWORDS
+)
+
+
+@dataclass(slots=True)
+class AgentState:
+    """State schema for the LangGraph agent; nodes mutate and return the same instance."""
     query: str
-    route: str
-    response: str
+    messages: list = field(default_factory=list)
+    route: str = ""
+    response: str = ""
+    query_vector: Optional[list] = None
+    documents_revision: Optional[int] = None
+    error: bool = False
 
 
 class AIAgent:
     """LangGraph agent that routes between weather API and RAG service."""
     
-    def __init__(self, weather_service: WeatherService, rag_service: RAGService):
-        """Initialize AIAgent with weather and RAG services."""
+    # Paraphrases the keyword list misses; embedded once as routing prototypes
+    WEATHER_EXEMPLARS = [
+        "What's the weather like today?",
+        "How hot is it in Paris?",
+        "How cold is it outside in Chicago?",
+        "Is it going to be sunny tomorrow in Madrid?",
+        "Do I need an umbrella in London?",
+        "Should I bring a jacket in Toronto today?",
+        "Is it cloudy in Berlin right now?",
+        "Is it stormy in Miami?",
+        "What's the outlook for this weekend in Rome?",
+        "Will it be warm in Sydney?",
+        "Is it freezing in Moscow?",
+        "How muggy is it in Singapore?",
+        "What are the current conditions in Tokyo?",
+        "Is there a heatwave in Delhi?",
+    ]
+    
+    def __init__(
+        self,
+        weather_service: WeatherService,
+        rag_service: RAGService,
+        semantic_cache: Optional[SemanticCache] = None,
+        use_intent_classifier: bool = False,
+        tracing_enabled: bool = LANGSMITH_TRACING_ENABLED
+    ):
+        """
+        Initialize AIAgent with weather and RAG services.
+        
+        Args:
+            weather_service: Service for weather lookups
+            rag_service: Service for document question answering
+            semantic_cache: Optional cache of responses to near-duplicate queries
+            use_intent_classifier: Fall back to embedding similarity against
+                WEATHER_EXEMPLARS when no weather keyword matches
+            tracing_enabled: Run queries through the compiled graph so LangSmith
+                sees every node; otherwise call the nodes directly
+        """
         self.weather_service = weather_service
         self.rag_service = rag_service
-        self.llm = ChatOpenAI(
-            model=LLM_MODEL,
-            temperature=0,
-            openai_api_key=OPENAI_API_KEY
-        )
+        self.semantic_cache = semantic_cache
+        self.tracing_enabled = tracing_enabled
+        self._weather_prototypes = self._build_weather_prototypes() if use_intent_classifier else None
         self.graph = self._build_graph()
     
+    @cached_property
+    def _route_executors(self) -> dict:
+        """
+        Separate worker pools per latency class so fast weather lookups never
+        queue behind multi-second RAG generations.
+        
+        Only aprocess_query uses them, so only async callers that share one
+        event loop get this isolation. process_query and stream_query (what the
+        Streamlit UI calls) run on the caller's thread; Streamlit gives each
+        session its own script thread, so sessions don't queue behind one
+        another there. The pools are created on the first aprocess_query call.
+        """
+        return {
+            "weather": ThreadPoolExecutor(max_workers=WEATHER_MAX_CONCURRENCY, thread_name_prefix="weather"),
+            "rag": ThreadPoolExecutor(max_workers=RAG_MAX_CONCURRENCY, thread_name_prefix="rag"),
+        }
+    
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph state graph."""
         workflow = StateGraph(AgentState)
@@ -58,8 +157,35 @@ class AIAgent:
         
         return workflow.compile()
     
+    def _build_weather_prototypes(self) -> np.ndarray:
+        """Embed WEATHER_EXEMPLARS into a normalized prototype matrix."""
+        prototypes = np.asarray(
+            self.rag_service.vector_store.embed_documents(self.WEATHER_EXEMPLARS),
+            dtype=np.float32
+        )
+        return prototypes / np.linalg.norm(prototypes, axis=1, keepdims=True)
+    
+    def _matches_weather_keywords(self, query: str) -> bool:
+        """Check whether the query contains any weather keyword."""
+        query_lower = query.translate(_ROUTING_TABLE)
+        if not _WEATHER_WORDS.isdisjoint(query_lower.split()):
+            return True
+        return _WEATHER_RE.search(query_lower) is not None
+    
     def _route_query(self, state: AgentState) -> AgentState:
-        """Route node: receives the query and prepares for routing."""
+        """
+        Route node: receives the query and prepares for routing.
+        
+        When the intent classifier is enabled and no keyword matches, the query
+        is embedded here so the decision node can score it and the RAG node can
+        reuse the same vector for retrieval.
+        """
+        if (
+            self._weather_prototypes is not None
+            and state.query_vector is None
+            and not self._matches_weather_keywords(state.query)
+        ):
+            state.query_vector = self.rag_service.embed_query(state.query)
         return state
     
     def _should_use_weather(self, state: AgentState) -> Literal["weather", "rag"]:
@@ -72,19 +198,18 @@ class AIAgent:
         Returns:
             "weather" or "rag" based on query intent
         """
-        query = state.get("query", "").lower()
-        
-        # Keywords that suggest weather query
-        weather_keywords = [
-            "weather", "temperature", "forecast", "humidity", 
-            "wind", "rain", "snow", "climate", "temperature in",
-            "weather in", "how's the weather", "what's the weather"
-        ]
-        
         # Check if query contains weather-related keywords
-        if any(keyword in query for keyword in weather_keywords):
+        if self._matches_weather_keywords(state.query):
             return "weather"
         
+        # Score paraphrases against the weather prototypes
+        query_vector = state.query_vector
+        if self._weather_prototypes is not None and query_vector is not None:
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            similarity = self._weather_prototypes @ (query_vector / np.linalg.norm(query_vector))
+            if similarity.max() > INTENT_SIMILARITY_THRESHOLD:
+                return "weather"
+        
         # Otherwise, use RAG
         return "rag"
     
@@ -98,7 +223,7 @@ class AIAgent:
         Returns:
             Updated state with weather response
         """
-        query = state.get("query", "")
+        query = state.query
         
         try:
             # Extract city name from query
@@ -111,13 +236,14 @@ class AIAgent:
                 weather_data = self.weather_service.get_weather(city)
                 response = self.weather_service.format_weather_response(weather_data)
             
-            state["response"] = response
-            state["route"] = "weather"
+            state.response = response
+            state.route = "weather"
             return state
             
         except Exception as e:
-            state["response"] = f"Sorry, I encountered an error fetching weather data: {str(e)}"
-            state["route"] = "weather"
+            state.response = f"Sorry, I encountered an error fetching weather data: {str(e)}"
+            state.route = "weather"
+            state.error = True
             return state
     
     def _handle_rag(self, state: AgentState) -> AgentState:
@@ -130,19 +256,24 @@ class AIAgent:
         Returns:
             Updated state with RAG response
         """
-        query = state.get("query", "")
+        query = state.query
         
         try:
-            result = self.rag_service.query(query)
-            state["response"] = result["answer"]
-            state["route"] = "rag"
+            result = self.rag_service.query(query, query_vector=state.query_vector)
+            state.response = result["answer"]
+            state.route = "rag"
             return state
             
         except Exception as e:
-            state["response"] = f"Sorry, I encountered an error processing your query: {str(e)}"
-            state["route"] = "rag"
+            state.response = self._rag_error_message(e)
+            state.route = "rag"
+            state.error = True
             return state
     
+    def _rag_error_message(self, error: Exception) -> str:
+        """Format the apology shown when the RAG route fails."""
+        return f"Sorry, I encountered an error processing your query: {str(error)}"
+    
     def _extract_city_from_query(self, query: str) -> str:
         """
         Extract city name from query string.
@@ -153,38 +284,73 @@ class AIAgent:
         Returns:
             Extracted city name or empty string
         """
-        query_lower = query.lower()
-        
-        # Common patterns
-        patterns = [
-            "in ",
-            "for ",
-            "at ",
-            "weather ",
-            "temperature "
-        ]
-        
-        for pattern in patterns:
-            if pattern in query_lower:
-                # Extract text after pattern
-                parts = query_lower.split(pattern, 1)
-                if len(parts) > 1:
-                    city_part = parts[1].strip()
-                    # Remove question marks and other punctuation
-                    city_part = city_part.rstrip("?.,!").strip()
-                    # Take first word or phrase (handle multi-word cities)
-                    words = city_part.split()
-                    # Try to get city name (first 1-3 words)
-                    if len(words) >= 1:
-                        # Common multi-word cities
-                        if len(words) >= 2 and words[0] in ["new", "san", "los", "saint", "st"]:
-                            city = " ".join(words[:2])
-                        else:
-                            city = words[0]
-                        return city.title()
-        
+        for pattern in _CITY_RES:
+            match = pattern.search(query)
+            if match:
+                return match.group(1).title()
         return ""
     
+    def _lookup_cache(self, query: str) -> Tuple[Optional[list], Optional[dict]]:
+        """
+        Embed the query and look it up in the semantic cache.
+        
+        Args:
+            query: User's query string
+            
+        Returns:
+            Tuple of (query embedding or None, cached result or None)
+        """
+        if self.semantic_cache is None:
+            return None, None
+        
+        # Embed once; the vector also serves RAG retrieval on a cache miss
+        query_vector = self.rag_service.embed_query(query)
+        cached = self.semantic_cache.get(query_vector, revision=self.rag_service.documents_revision)
+        if not cached:
+            return query_vector, None
+        
+        return query_vector, {
+            "query": query,
+            "response": cached["response"],
+            "route": cached["route"],
+            "cached": True
+        }
+    
+    def _initial_state(self, query: str, query_vector: Optional[list]) -> AgentState:
+        """Build the initial graph state for a query."""
+        # Read before retrieval so an ingest mid-answer leaves the result tagged stale
+        return AgentState(
+            query=query,
+            query_vector=query_vector,
+            documents_revision=self.rag_service.documents_revision
+        )
+    
+    def _invoke_graph(self, state: AgentState) -> AgentState:
+        """Run the compiled graph; LangGraph returns dataclass state as a dict."""
+        return AgentState(**self.graph.invoke(state))
+    
+    def _finalize(self, query: str, query_vector: Optional[list], final_state: AgentState) -> dict:
+        """Build the result dictionary and store it in the semantic cache."""
+        result = {
+            "query": query,
+            "response": final_state.response,
+            "route": final_state.route,
+            "cached": False
+        }
+        
+        # Never cache error responses
+        if self.semantic_cache is not None and not final_state.error:
+            self.semantic_cache.set(query, query_vector, result, revision=final_state.documents_revision)
+        
+        return result
+    
+    def _run_nodes(self, state: AgentState) -> AgentState:
+        """Run the graph's nodes directly, skipping LangGraph's per-step overhead."""
+        state = self._route_query(state)
+        if self._should_use_weather(state) == "weather":
+            return self._handle_weather(state)
+        return self._handle_rag(state)
+    
     def process_query(self, query: str) -> dict:
         """
         Process a user query through the agent.
@@ -195,19 +361,103 @@ class AIAgent:
         Returns:
             Dictionary containing response and metadata
         """
-        initial_state = {
-            "messages": [],
-            "query": query,
-            "route": "",
-            "response": ""
-        }
+        query_vector, cached = self._lookup_cache(query)
+        if cached:
+            return cached
+        
+        initial_state = self._initial_state(query, query_vector)
+        if self.tracing_enabled:
+            final_state = self._invoke_graph(initial_state)
+        else:
+            final_state = self._run_nodes(initial_state)
+        
+        return self._finalize(query, query_vector, final_state)
+    
+    async def aprocess_query(self, query: str) -> dict:
+        """
+        Process a user query through the agent without blocking the event loop.
         
-        # Run the graph
-        final_state = self.graph.invoke(initial_state)
+        Weather and RAG work run in separate worker pools (see _route_executors),
+        so on a shared event loop a slow RAG answer can't delay weather replies.
+        
+        Args:
+            query: User's query string
+            
+        Returns:
+            Dictionary containing response and metadata
+        """
+        loop = asyncio.get_running_loop()
+        query_vector, cached = await loop.run_in_executor(None, self._lookup_cache, query)
+        if cached:
+            return cached
+        
+        # Classify first so the query runs in its route's worker pool
+        state = await loop.run_in_executor(None, self._route_query, self._initial_state(query, query_vector))
+        route = self._should_use_weather(state)
+        executor = self._route_executors[route]
+        
+        if self.tracing_enabled:
+            final_state = await loop.run_in_executor(executor, self._invoke_graph, state)
+        else:
+            handler = self._handle_weather if route == "weather" else self._handle_rag
+            final_state = await loop.run_in_executor(executor, handler, state)
+        
+        return await loop.run_in_executor(None, self._finalize, query, query_vector, final_state)
+    
+    def stream_query(self, query: str) -> dict:
+        """
+        Route a query and return its response as a token stream.
+        
+        Routing and the cache lookup happen before this returns, so callers can
+        show the route immediately. The semantic cache is updated once the
+        stream has been fully consumed. With tracing enabled the query runs
+        through the compiled graph instead and the whole response arrives as
+        a single chunk.
+        
+        Args:
+            query: User's query string
+            
+        Returns:
+            Dictionary with query, route, cached flag and a "stream" iterator of text chunks
+        """
+        query_vector, cached = self._lookup_cache(query)
+        if cached:
+            return {**cached, "stream": iter([cached["response"]])}
+        
+        if self.tracing_enabled:
+            # Graph nodes return complete states, so LangSmith sees every node
+            # at the cost of token streaming
+            result = self._finalize(query, query_vector, self._invoke_graph(self._initial_state(query, query_vector)))
+            return {**result, "stream": iter([result["response"]])}
+        
+        state = self._route_query(self._initial_state(query, query_vector))
+        route = self._should_use_weather(state)
         
         return {
             "query": query,
-            "response": final_state["response"],
-            "route": final_state["route"]
+            "route": route,
+            "cached": False,
+            "stream": self._stream_response(state, route)
         }
-
+    
+    def _stream_response(self, state: AgentState, route: str) -> Iterator[str]:
+        """Yield the response for an already-routed state, then finalize it."""
+        if route == "weather":
+            # Weather answers are formatted locally, so there is nothing to stream
+            state = self._handle_weather(state)
+            yield state.response
+        else:
+            state.route = "rag"
+            parts = []
+            try:
+                for chunk in self.rag_service.stream(state.query, query_vector=state.query_vector):
+                    parts.append(chunk)
+                    yield chunk
+            except Exception as e:
+                message = self._rag_error_message(e)
+                parts.append(message)
+                state.error = True
+                yield message
+            state.response = "".join(parts)
+        
+        self._finalize(state.query, state.query_vector, state)
@@ -1,5 +1,7 @@
 """Streamlit UI application for the AI Assignment."""
+import asyncio
 import os
+import threading
 import time
 from typing import Dict
 
@@ -11,7 +13,14 @@ from rag_service import RAGService
 from vector_store import VectorStore
 from pdf_processor import PDFProcessor
 from evaluator import ResponseEvaluator
-from config import PDF_UPLOAD_DIR
+from semantic_cache import SemanticCache, SimilarityLRU
+from config import (
+    PDF_UPLOAD_DIR,
+    QUERY_CACHE_COLLECTION,
+    SEMANTIC_CACHE_ENABLED,
+    INTENT_CLASSIFIER_ENABLED,
+    RAG_ANSWER_CACHE_ENABLED,
+)
 
 
 # Page configuration
@@ -65,10 +74,11 @@ def _get_theme_palette(is_dark: bool) -> Dict[str, str]:
     }
 
 
-def _apply_theme_styles():
-    palette = _get_theme_palette(st.session_state.dark_mode)
-    st.markdown(
-        f"""
+@st.cache_data(show_spinner=False)
+def _theme_css(is_dark: bool) -> str:
+    """Render the theme stylesheet once per theme instead of on every rerun."""
+    palette = _get_theme_palette(is_dark)
+    return f"""
         <style>
         @import url('https://fonts.googleapis.com/css2?family=Space+Grotesk:wght@400;500;600&display=swap');
 
@@ -372,9 +382,12 @@ def _apply_theme_styles():
             transform: translateY(-1px);
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+def _apply_theme_styles():
+    # Streamlit drops elements a rerun doesn't emit, so the cached CSS is still sent each run
+    st.markdown(_theme_css(st.session_state.dark_mode), unsafe_allow_html=True)
 
 
 _apply_theme_styles()
@@ -394,16 +407,34 @@ if "last_route" not in st.session_state:
     st.session_state.last_route = "—"
 
 
+@st.cache_resource(show_spinner=False)
+def get_agent() -> AIAgent:
+    """Build the agent once per process; the compiled graph and clients survive reruns and sessions."""
+    weather_service = WeatherService()
+    vector_store = VectorStore()
+    rag_service = RAGService(vector_store, answer_cache=SimilarityLRU() if RAG_ANSWER_CACHE_ENABLED else None)
+    semantic_cache = (
+        SemanticCache(vector_store.for_collection(QUERY_CACHE_COLLECTION)) if SEMANTIC_CACHE_ENABLED else None
+    )
+    return AIAgent(
+        weather_service,
+        rag_service,
+        semantic_cache=semantic_cache,
+        use_intent_classifier=INTENT_CLASSIFIER_ENABLED
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_evaluator() -> ResponseEvaluator:
+    """Return the process-wide LangSmith evaluator."""
+    return ResponseEvaluator()
+
+
 def initialize_services():
     """Initialize all required services."""
     try:
-        # Initialize services
-        weather_service = WeatherService()
-        vector_store = VectorStore()
-        rag_service = RAGService(vector_store)
-        agent = AIAgent(weather_service, rag_service)
-        
-        st.session_state.agent = agent
+        # Failed builds raise and are not cached, so the next rerun retries
+        st.session_state.agent = get_agent()
         st.session_state.vector_store_initialized = True
         return True
     except Exception as e:
@@ -411,25 +442,44 @@ def initialize_services():
         return False
 
 
-def process_pdf_upload(uploaded_file):
-    """Process uploaded PDF file and add to vector store."""
+def _evaluate_in_background(query: str, response: str, route: str):
+    """Log the response to LangSmith on a daemon thread, off the request path."""
+    evaluator = get_evaluator()
+    
+    def _run():
+        try:
+            evaluator.evaluate_response(query=query, response=response, route=route)
+        except Exception:
+            pass
+    
+    threading.Thread(target=_run, daemon=True).start()
+
+
+def _write_file(path: str, data: bytes):
+    """Write bytes to disk; run in an executor so parsing can proceed meanwhile."""
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+async def process_pdf_upload(uploaded_file, vector_store: VectorStore):
+    """Process uploaded PDF file and add to the agent's vector store."""
     try:
-        # Save uploaded file
+        # Save uploaded file while parsing the same bytes from memory
         os.makedirs(PDF_UPLOAD_DIR, exist_ok=True)
         file_path = os.path.join(PDF_UPLOAD_DIR, uploaded_file.name)
+        data = uploaded_file.getvalue()
         
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        
-        # Process PDF
+        loop = asyncio.get_running_loop()
         processor = PDFProcessor()
-        chunks = processor.process_pdf(file_path)
+        _, chunks = await asyncio.gather(
+            loop.run_in_executor(None, _write_file, file_path, data),
+            loop.run_in_executor(None, processor.process_pdf_bytes, data, uploaded_file.name, file_path),
+        )
         
         # Add to vector store
-        vector_store = VectorStore()
         texts = [chunk["text"] for chunk in chunks]
         metadatas = [chunk["metadata"] for chunk in chunks]
-        vector_store.add_documents(texts, metadatas)
+        await vector_store.add_documents_async(texts, metadatas)
         
         st.session_state.documents.append(
             {
@@ -440,6 +490,9 @@ def process_pdf_upload(uploaded_file):
         return True, f"Successfully processed {len(chunks)} chunks from {uploaded_file.name}"
     except Exception as e:
         return False, f"Error processing PDF: {str(e)}"
+    finally:
+        # The caller's asyncio.run loop ends here; close the clients bound to it
+        await vector_store.aclose()
 
 
 # Main UI
@@ -507,7 +560,12 @@ with st.sidebar:
     if uploaded_file is not None:
         if st.button("Process PDF"):
             with st.spinner("Processing PDF..."):
-                success, message = process_pdf_upload(uploaded_file)
+                if st.session_state.agent is None:
+                    success, message = False, "Services are not initialized yet. Please check your configuration."
+                else:
+                    # Reuse the agent's vector store instead of opening a new Qdrant client
+                    vector_store = st.session_state.agent.rag_service.vector_store
+                    success, message = asyncio.run(process_pdf_upload(uploaded_file, vector_store))
                 if success:
                     st.success(message)
                     st.session_state.vector_store_initialized = True
@@ -537,7 +595,8 @@ chat_tab, kb_tab = st.tabs(["💬 Chat", "📚 Knowledge Base"])
 with chat_tab:
     st.subheader("Ask about weather or your documents")
 
-    # Display chat history
+    # Display chat history; message content never goes through unsafe_allow_html,
+    # since it carries user prompts and model output steered by uploaded documents
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
@@ -556,45 +615,37 @@ with chat_tab:
         
         # Get agent response
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                try:
-                    result = st.session_state.agent.process_query(prompt)
-                    st.session_state.last_route = result["route"]
-                    if result["route"] in st.session_state.route_stats:
-                        st.session_state.route_stats[result["route"]] += 1
-                    
-                    # Display response
-                    st.markdown(result["response"])
-                    st.markdown(
-                        f"<span class='route-pill {result['route']}'>Route · {result['route'].upper()}</span>",
-                        unsafe_allow_html=True,
-                    )
-                    
-                    # Evaluate with LangSmith (if configured)
-                    try:
-                        evaluator = ResponseEvaluator()
-                        evaluator.evaluate_response(
-                            query=prompt,
-                            response=result["response"],
-                            route=result["route"]
-                        )
-                    except Exception:
-                        pass
-                    
-                    # Add to chat history
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": result["response"],
-                        "route": result["route"]
-                    })
-                    
-                except Exception as e:
-                    error_msg = f"Error: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_msg
-                    })
+            try:
+                with st.spinner("Thinking..."):
+                    result = st.session_state.agent.stream_query(prompt)
+                st.session_state.last_route = result["route"]
+                if result["route"] in st.session_state.route_stats:
+                    st.session_state.route_stats[result["route"]] += 1
+                
+                # Stream the response as tokens arrive
+                result["response"] = st.write_stream(result["stream"])
+                st.markdown(
+                    f"<span class='route-pill {result['route']}'>Route · {result['route'].upper()}</span>",
+                    unsafe_allow_html=True,
+                )
+                
+                # Evaluate with LangSmith (if configured) without blocking the reply
+                _evaluate_in_background(prompt, result["response"], result["route"])
+                
+                # Add to chat history
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": result["response"],
+                    "route": result["route"]
+                })
+                
+            except Exception as e:
+                error_msg = f"Error: {str(e)}"
+                st.error(error_msg)
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": error_msg
+                })
 
 with kb_tab:
     st.subheader("Knowledge base monitor")
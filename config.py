@@ -13,18 +13,63 @@ OPENWEATHERMAP_API_KEY = os.getenv("OPENWEATHERMAP_API_KEY")
 LANGSMITH_PROJECT = os.getenv("LANGSMITH_PROJECT", "ai-assignment")
 LANGSMITH_TRACING_V2 = "true"
 LANGSMITH_ENDPOINT = "https://api.smith.langchain.com"
+LANGSMITH_TRACING_ENABLED = bool(LANGSMITH_API_KEY) and LANGSMITH_TRACING_V2 == "true"
 
 # Qdrant Configuration
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", 6334))
+# protobuf over gRPC has far lower per-call overhead than JSON over REST
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "true").lower() == "true"
 QDRANT_COLLECTION_NAME = "pdf_documents"
+QUERY_CACHE_COLLECTION = "query_cache"
+# Quantization and HNSW settings apply to newly created collections
+QDRANT_QUANTIZATION_ENABLED = os.getenv("QDRANT_QUANTIZATION_ENABLED", "true").lower() == "true"
+QDRANT_QUANTIZATION_TYPE = os.getenv("QDRANT_QUANTIZATION_TYPE", "int8").lower()  # "int8" or "binary"
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", 16))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", 128))
+QDRANT_RESCORE_CANDIDATES = int(os.getenv("QDRANT_RESCORE_CANDIDATES", 20))
+# Collections up to this many points are also mirrored in RAM and searched locally; 0 disables
+LOCAL_SEARCH_THRESHOLD = int(os.getenv("LOCAL_SEARCH_THRESHOLD", 10000))
 
 # OpenAI Configuration
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 2048))  # OpenAI's max inputs per request
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", 4))  # concurrent embedding requests
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 6))
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", 1024))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")  # empty disables persistence
 LLM_MODEL = "gpt-3.5-turbo"
 
+# Routing Configuration
+# Off by default and deliberately strict: the threshold is uncalibrated, and a false
+# positive sends a document question to the weather API. Tune it on labelled queries
+# for the embedding model in use before enabling.
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "false").lower() == "true"
+INTENT_SIMILARITY_THRESHOLD = float(os.getenv("INTENT_SIMILARITY_THRESHOLD", 0.8))
+WEATHER_MAX_CONCURRENCY = int(os.getenv("WEATHER_MAX_CONCURRENCY", 20))
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", 4))
+
+# Weather Configuration
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", 256))
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", 300))  # seconds
+
 # Application Configuration
 PDF_UPLOAD_DIR = "uploads"
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Documents with at least this many pages are extracted across worker processes
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 32))
+# Parallel extraction is opt-in: each spawned worker re-imports the text splitter,
+# and that start-up cost hasn't been measured against serial extraction yet
+PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", 1))
+
 
+# Semantic Cache Configuration
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 300))  # seconds
+# In-process cache of RAG answers, invalidated whenever documents are ingested
+RAG_ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE_ENABLED", "true").lower() == "true"
+RAG_ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", 128))
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", 0.95))
@@ -0,0 +1,155 @@
+"""Exact-match embedding cache with an in-memory LRU and optional SQLite persistence."""
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+import xxhash
+from config import EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH
+
+
+class EmbeddingCache:
+    """Cache of embeddings keyed on the model and the query or document text.
+    
+    Query embeddings live in an in-memory LRU backed by SQLite; document
+    embeddings are only persisted, since an ingest reads each one once.
+    """
+    
+    def __init__(
+        self,
+        model: str,
+        max_entries: int = EMBEDDING_CACHE_SIZE,
+        path: Optional[str] = EMBEDDING_CACHE_PATH
+    ):
+        """
+        Initialize EmbeddingCache.
+        
+        Args:
+            model: Embedding model name, part of every key so model swaps never hit stale vectors
+            max_entries: Number of embeddings kept in the in-memory LRU
+            path: SQLite file used to persist embeddings across restarts; falsy disables it
+        """
+        self.model = model
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = self._open_db(path) if path else None
+    
+    def _open_db(self, path: str) -> sqlite3.Connection:
+        """Open the SQLite store, creating its directory and table if needed."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)")
+        db.commit()
+        return db
+    
+    def _key(self, query: str) -> bytes:
+        """Hash the model and normalized query into a fixed-size key."""
+        normalized = query.strip().lower()
+        return hashlib.sha256(f"{self.model}\0query\0{normalized}".encode()).digest()
+    
+    def _document_key(self, text: str) -> bytes:
+        """Hash the model and exact document text into a fixed-size key."""
+        return xxhash.xxh3_128_digest(f"{self.model}\0document\0{text}".encode())
+    
+    def get(self, query: str) -> Optional[List[float]]:
+        """
+        Look up the embedding for a query.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Cached embedding vector, or None on miss
+        """
+        key = self._key(query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                return vector
+            
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+            self._remember(key, vector)
+            return vector
+    
+    def set(self, query: str, vector: List[float]):
+        """
+        Store the embedding for a query.
+        
+        Args:
+            query: Query text
+            vector: Embedding vector
+        """
+        key = self._key(query)
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, np.asarray(vector, dtype=np.float32).tobytes())
+                )
+                self._db.commit()
+    
+    def get_documents(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up persisted embeddings for document texts.
+        
+        Args:
+            texts: Document texts
+            
+        Returns:
+            One cached embedding per text, or None where it is a miss
+        """
+        if self._db is None:
+            return [None] * len(texts)
+        
+        keys = [self._document_key(text) for text in texts]
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                found.update(self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall())
+        return [
+            np.frombuffer(found[key], dtype=np.float32).tolist() if key in found else None
+            for key in keys
+        ]
+    
+    def set_documents(self, texts: List[str], vectors: List[List[float]]):
+        """
+        Persist embeddings for document texts.
+        
+        Args:
+            texts: Document texts
+            vectors: Embedding vectors aligned with texts
+        """
+        if self._db is None:
+            return
+        
+        rows = [
+            (self._document_key(text), np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._db.commit()
+    
+    def _remember(self, key: bytes, vector: List[float]):
+        """Insert into the in-memory LRU, evicting the oldest entry when full."""
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
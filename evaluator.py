@@ -1,12 +1,29 @@
 """LangSmith evaluation module for LLM response evaluation."""
+import re
+from functools import lru_cache
+from typing import List
 from langsmith import Client
 from langchain_core.tracers import LangChainTracer
 from config import LANGSMITH_API_KEY, LANGSMITH_PROJECT
 
 
+@lru_cache(maxsize=256)
+def _query_words(query: str) -> frozenset:
+    """Lowercased query words; cached because the same query is often evaluated repeatedly."""
+    return frozenset(query.lower().split())
+
+
 class ResponseEvaluator:
     """Evaluator for LLM responses using LangSmith."""
     
+    # One precompiled alternation per group. A single combined pattern would let a
+    # match from one group consume the start of another ("temperaturerror")
+    _INDICATOR_PATTERNS = {
+        "apology": re.compile(r"sorry"),
+        "error": re.compile(r"error|failed|couldn't|unable"),
+        "weather": re.compile(r"temperature|humidity|wind|weather"),
+    }
+    
     def __init__(self):
         """Initialize ResponseEvaluator with LangSmith client."""
         self.client = Client(api_key=LANGSMITH_API_KEY) if LANGSMITH_API_KEY else None
@@ -78,6 +95,8 @@ class ResponseEvaluator:
         """
         score = 0.0
         comments = []
+        response_lower = response.lower()
+        indicators = self._find_indicators(response_lower)
         
         # Check response length
         if len(response) > 10:
@@ -86,28 +105,22 @@ class ResponseEvaluator:
             comments.append("Response too short")
         
         # Check if response addresses the query
-        query_words = set(query.lower().split())
-        response_words = set(response.lower().split())
-        overlap = len(query_words.intersection(response_words))
-        
-        if overlap > 0:
+        # isdisjoint stops at the first shared word; only whether any overlap exists matters
+        if not _query_words(query).isdisjoint(response_lower.split()):
             score += 0.3
         else:
             comments.append("Response may not address query")
         
         # Check for error messages
-        error_indicators = ["error", "failed", "sorry", "couldn't", "unable"]
-        has_error = any(indicator in response.lower() for indicator in error_indicators)
-        
-        if not has_error or "sorry" in response.lower():
+        # An apology counts as an error indicator but still earns the credit
+        if "error" not in indicators or "apology" in indicators:
             score += 0.2
         else:
             comments.append("Response contains error indicators")
         
         # Route-specific checks
         if route == "weather":
-            weather_indicators = ["temperature", "humidity", "wind", "weather"]
-            if any(indicator in response.lower() for indicator in weather_indicators):
+            if "weather" in indicators:
                 score += 0.2
         elif route == "rag":
             if len(response) > 50:  # RAG responses should be more detailed
@@ -121,6 +134,25 @@ class ResponseEvaluator:
             "comment": "; ".join(comments) if comments else "Good response"
         }
     
+    def _find_indicators(self, response_lower: str) -> set:
+        """Return the indicator groups that occur in a lowercased response."""
+        return {group for group, pattern in self._INDICATOR_PATTERNS.items() if pattern.search(response_lower)}
+    
+    def evaluate_batch(self, queries: List[str], responses: List[str], routes: List[str]) -> List[dict]:
+        """
+        Score many responses offline with the quality heuristics, without logging to LangSmith.
+        
+        Args:
+            queries: User queries
+            responses: LLM responses aligned with queries
+            routes: Routes taken, aligned with queries
+            
+        Returns:
+            One score/comment dictionary per response, in input order
+        """
+        evaluate = self._evaluate_quality
+        return [evaluate(query, response, route) for query, response, route in zip(queries, responses, routes)]
+    
     def get_tracer(self):
         """Get LangChain tracer for automatic logging."""
         if not self.client:
@@ -0,0 +1,83 @@
+"""In-process mirror of a small Qdrant collection for exact numpy search."""
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+class LocalIndex:
+    """Unit-length vectors and payloads held in RAM, searched with one matrix product."""
+    
+    def __init__(self):
+        """Initialize an empty LocalIndex; the vector size is taken from the first upsert."""
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # capacity grows in powers of two
+        self._payloads: List[Dict] = []
+        self._rows: Dict[Any, int] = {}  # point ID -> matrix row
+    
+    def __len__(self) -> int:
+        return len(self._payloads)
+    
+    def upsert(self, ids: List[Any], vectors: List[List[float]], payloads: List[Dict]):
+        """
+        Insert points, overwriting any with the same ID as Qdrant does.
+        
+        Args:
+            ids: Point IDs
+            vectors: Unit-length vectors aligned with ids
+            payloads: Point payloads aligned with ids
+        """
+        if not ids:
+            return
+        
+        rows = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            for point_id, row, payload in zip(ids, rows, payloads):
+                idx = self._rows.get(point_id)
+                if idx is None:
+                    idx = len(self._payloads)
+                    self._reserve(idx + 1, row.shape[0])
+                    self._rows[point_id] = idx
+                    self._payloads.append(payload)
+                else:
+                    self._payloads[idx] = payload
+                self._matrix[idx] = row
+    
+    def _reserve(self, size: int, dim: int):
+        """Grow the matrix to hold at least size rows, doubling its capacity."""
+        if self._matrix is None:
+            self._matrix = np.empty((max(64, size), dim), dtype=np.float32)
+        elif size > self._matrix.shape[0]:
+            grown = np.empty((max(size, 2 * self._matrix.shape[0]), dim), dtype=np.float32)
+            grown[:len(self._payloads)] = self._matrix[:len(self._payloads)]
+            self._matrix = grown
+    
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int,
+        score_threshold: Optional[float] = None
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Return the top_k payloads by dot product with a unit-length query.
+        
+        Args:
+            query_vector: Unit-length query vector
+            top_k: Number of results to return
+            score_threshold: Optional minimum score
+            
+        Returns:
+            (payload, score) pairs, best first
+        """
+        with self._lock:
+            count = len(self._payloads)
+            if count == 0:
+                return []
+            scores = self._matrix[:count] @ np.asarray(query_vector, dtype=np.float32)
+            # argpartition finds the top_k in linear time; only those get sorted
+            candidates = np.argpartition(-scores, top_k)[:top_k] if top_k < count else np.arange(count)
+            ranked = candidates[np.argsort(-scores[candidates])]
+            return [
+                (self._payloads[idx], float(scores[idx]))
+                for idx in ranked
+                if score_threshold is None or scores[idx] >= score_threshold
+            ]
@@ -1,9 +1,73 @@
 """PDF processing module for extracting and chunking text from PDF documents."""
+import io
+import math
+import mmap
+import multiprocessing
 import os
-from typing import List, Dict, Optional
-from pypdf import PdfReader
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Dict, Optional, Union
+from pypdf import PageObject, PdfReader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from config import CHUNK_SIZE, CHUNK_OVERLAP, PDF_UPLOAD_DIR
+from config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    PDF_UPLOAD_DIR,
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_MAX_WORKERS,
+)
+
+
+@contextmanager
+def _open_reader(source: Union[str, bytes]) -> Iterator[PdfReader]:
+    """Open a PdfReader over in-memory bytes or a memory-mapped file path."""
+    if isinstance(source, bytes):
+        yield PdfReader(io.BytesIO(source))
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield PdfReader(mapped)
+
+
+def _uses_fonts(resources, depth: int = 0) -> bool:
+    """Whether a resource dictionary, or a form XObject it draws, references any font."""
+    if not resources or depth > 4:
+        return False
+    resources = resources.get_object()
+    if "/Font" in resources and resources["/Font"]:
+        return True
+    if "/XObject" not in resources:
+        return False
+    for xobject in resources["/XObject"].values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and _uses_fonts(xobject.get("/Resources"), depth + 1):
+            return True
+    return False
+
+
+def _page_text(page: PageObject) -> str:
+    """Extract a page's text, skipping fontless (scanned or image-only) pages without decoding them."""
+    # Text can only be drawn with a font, so a page without one has nothing to extract
+    if not _uses_fonts(page.get("/Resources")):
+        return ""
+    return page.extract_text()
+
+
+def _extract_page_range(source: Union[str, bytes], start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop); module-level so worker processes can run it."""
+    with _open_reader(source) as reader:
+        return [_page_text(reader.pages[idx]) for idx in range(start, stop)]
+
+
+@lru_cache(maxsize=1)
+def _get_executor() -> ProcessPoolExecutor:
+    """Return the process-wide extraction pool, started on first large document."""
+    # spawn rather than fork: the parent holds gRPC channels and Streamlit threads
+    return ProcessPoolExecutor(
+        max_workers=PDF_MAX_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
 
 
 class PDFProcessor:
@@ -35,12 +99,42 @@ class PDFProcessor:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
+        return self._extract(pdf_path)
+    
+    def extract_text_from_bytes(self, data: bytes) -> str:
+        """
+        Extract text from PDF content held in memory.
+        
+        Args:
+            data: Raw PDF bytes
+            
+        Returns:
+            Extracted text as a string
+        """
+        return self._extract(data)
+    
+    def _extract(self, source: Union[str, bytes]) -> str:
+        """Extract text from a file path or raw PDF bytes."""
         try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            with _open_reader(source) as reader:
+                page_count = len(reader.pages)
+                if page_count < PDF_PARALLEL_MIN_PAGES or PDF_MAX_WORKERS < 2:
+                    return "\n".join([_page_text(page) for page in reader.pages]).strip()
+            
+            try:
+                # One contiguous page range per worker, so the source is shipped once per worker
+                step = math.ceil(page_count / PDF_MAX_WORKERS)
+                futures = [
+                    _get_executor().submit(_extract_page_range, source, start, min(start + step, page_count))
+                    for start in range(0, page_count, step)
+                ]
+                pages = [text for future in futures for text in future.result()]
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM); drop the pool so the next document gets
+                # a fresh one, and finish this document in-process
+                _get_executor.cache_clear()
+                pages = _extract_page_range(source, 0, page_count)
+            return "\n".join(pages).strip()
         except Exception as e:
             raise Exception(f"Failed to extract text from PDF: {str(e)}")
     
@@ -88,4 +182,22 @@ class PDFProcessor:
             "file_path": pdf_path
         }
         return self.chunk_text(text, metadata)
-
+    
+    def process_pdf_bytes(self, data: bytes, source_name: str, file_path: Optional[str] = None) -> List[Dict]:
+        """
+        Process in-memory PDF content: extract text and chunk it.
+        
+        Args:
+            data: Raw PDF bytes
+            source_name: Name for the source document
+            file_path: Optional path the PDF is (being) saved to
+            
+        Returns:
+            List of chunked documents with metadata
+        """
+        text = self.extract_text_from_bytes(data)
+        metadata = {
+            "source": source_name,
+            "file_path": file_path or source_name
+        }
+        return self.chunk_text(text, metadata)
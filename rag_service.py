@@ -1,76 +1,258 @@
 """RAG (Retrieval-Augmented Generation) service for querying PDF documents."""
-from typing import List, Dict
+from functools import lru_cache
+from typing import AsyncIterator, List, Dict, Iterator, Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from vector_store import VectorStore
+from semantic_cache import SimilarityLRU
 from config import LLM_MODEL, OPENAI_API_KEY
 
 
+SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the provided context.
+Use only the information from the context to answer the question. If the context doesn't contain
+enough information to answer the question, say so clearly.
+
+Provide a clear and concise answer based on the context."""
+
+
+@lru_cache(maxsize=1)
+def _get_llm() -> ChatOpenAI:
+    """Return the process-wide chat model so HTTP pools and tokenizers are reused."""
+    return ChatOpenAI(
+        model=LLM_MODEL,
+        temperature=0,
+        openai_api_key=OPENAI_API_KEY
+    )
+
+
 class RAGService:
     """Service for RAG-based query answering from PDF documents."""
     
-    def __init__(self, vector_store: VectorStore):
-        """Initialize RAGService with vector store and LLM."""
+    def __init__(self, vector_store: VectorStore, answer_cache: Optional[SimilarityLRU] = None):
+        """
+        Initialize RAGService with vector store and LLM.
+        
+        Args:
+            vector_store: Store to retrieve document chunks from
+            answer_cache: Optional cache of answers to near-identical earlier questions
+        """
         self.vector_store = vector_store
-        self.llm = ChatOpenAI(
-            model=LLM_MODEL,
-            temperature=0,
-            openai_api_key=OPENAI_API_KEY
-        )
+        self.answer_cache = answer_cache
+        self._answer_cache_revision = None
+        self.llm = _get_llm()
+        # Stable system prompt first, variable context and question last, so the
+        # provider's prompt-prefix cache can reuse the shared prefix across queries
         self.prompt_template = ChatPromptTemplate.from_messages([
-            ("system", """You are a helpful assistant that answers questions based on the provided context.
-            Use only the information from the context to answer the question. If the context doesn't contain
-            enough information to answer the question, say so clearly.
-            
-            Context:
-            {context}
-            
-            Question: {question}
-            
-            Provide a clear and concise answer based on the context above."""),
-            ("human", "{question}")
+            ("system", SYSTEM_PROMPT),
+            ("human", "Context:\n{context}\n\nQuestion: {question}")
         ])
+        self.chain = self.prompt_template | self.llm
+    
+    @property
+    def documents_revision(self) -> int:
+        """Revision of the underlying documents; changes on every ingest or clear."""
+        return self.vector_store.revision
+    
+    def embed_query(self, question: str) -> List[float]:
+        """Embed a question with the vector store's embeddings model."""
+        return self.vector_store.embed_query(question)
+    
+    def _cached_answer(self, query_vector: Optional[List[float]]) -> Optional[Dict]:
+        """Return the result for a near-identical earlier question, if the documents haven't changed."""
+        if self.answer_cache is None or query_vector is None:
+            return None
+        # Any ingest or clear bumps the store's revision and invalidates every answer
+        revision = self.vector_store.revision
+        if revision != self._answer_cache_revision:
+            self.answer_cache.clear()
+            self._answer_cache_revision = revision
+        return self.answer_cache.get(query_vector)
+    
+    def _remember_answer(self, query_vector: Optional[List[float]], result: Dict):
+        """Cache a result unless the documents changed while it was being generated."""
+        if self.answer_cache is None or query_vector is None:
+            return
+        if self.vector_store.revision == self._answer_cache_revision:
+            self.answer_cache.put(query_vector, result)
+    
+    def _retrieve(self, question: str, top_k: int, query_vector: Optional[List[float]]) -> List[Dict]:
+        """Retrieve relevant chunks, reusing a precomputed embedding when given."""
+        if query_vector is not None:
+            return self.vector_store.search_by_vector(query_vector, top_k=top_k)
+        return self.vector_store.search(question, top_k=top_k)
     
-    def query(self, question: str, top_k: int = 3) -> Dict:
+    async def _aretrieve(self, question: str, top_k: int, query_vector: Optional[List[float]]) -> List[Dict]:
+        """Async counterpart of _retrieve."""
+        if query_vector is not None:
+            return await self.vector_store.asearch_by_vector(query_vector, top_k=top_k)
+        return await self.vector_store.asearch(question, top_k=top_k)
+    
+    def _build_context(self, retrieved_docs: List[Dict]) -> str:
+        """Join retrieved chunks into a single context string."""
+        # Document order rather than score order, so the same chunks yield the same prefix
+        ordered_docs = sorted(
+            retrieved_docs,
+            key=lambda doc: (str(doc["metadata"].get("source", "")), doc["metadata"].get("chunk_index", 0))
+        )
+        # dict.fromkeys drops repeated chunk texts while keeping first-seen order
+        return "\n\n---\n\n".join(dict.fromkeys(doc["text"] for doc in ordered_docs))
+    
+    def _build_result(self, response, retrieved_docs: List[Dict]) -> Dict:
+        """Build the query result from an LLM response and its retrieved chunks."""
+        if not retrieved_docs:
+            return {
+                "answer": "I couldn't find any relevant information in the documents to answer your question.",
+                "sources": [],
+                "retrieved_chunks": []
+            }
+        
+        answer = response.content if hasattr(response, 'content') else str(response)
+        
+        return {
+            "answer": answer,
+            "sources": [doc["metadata"] for doc in retrieved_docs],
+            "retrieved_chunks": retrieved_docs
+        }
+    
+    def query(self, question: str, top_k: int = 3, query_vector: Optional[List[float]] = None) -> Dict:
         """
         Query the RAG system with a question.
         
         Args:
             question: User's question
             top_k: Number of relevant chunks to retrieve
+            query_vector: Optional precomputed embedding of the question
             
         Returns:
             Dictionary containing answer and retrieved context
         """
+        if self.answer_cache is not None and query_vector is None:
+            query_vector = self.embed_query(question)
+        cached = self._cached_answer(query_vector)
+        if cached is not None:
+            return cached
+        
         # Retrieve relevant documents
-        retrieved_docs = self.vector_store.search(question, top_k=top_k)
+        retrieved_docs = self._retrieve(question, top_k, query_vector)
         
         if not retrieved_docs:
-            return {
-                "answer": "I couldn't find any relevant information in the documents to answer your question.",
-                "sources": [],
-                "retrieved_chunks": []
-            }
+            return self._build_result(None, retrieved_docs)
         
-        # Build context from retrieved documents
-        context_parts = []
-        for doc in retrieved_docs:
-            context_parts.append(doc["text"])
+        # Generate answer using LLM
+        response = self.chain.invoke({
+            "context": self._build_context(retrieved_docs),
+            "question": question
+        })
         
-        context = "\n\n---\n\n".join(context_parts)
+        result = self._build_result(response, retrieved_docs)
+        self._remember_answer(query_vector, result)
+        return result
+    
+    def stream(self, question: str, top_k: int = 3, query_vector: Optional[List[float]] = None) -> Iterator[str]:
+        """
+        Answer a question, yielding the LLM's answer as it is generated.
         
-        # Generate answer using LLM
-        chain = self.prompt_template | self.llm
-        response = chain.invoke({
-            "context": context,
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            query_vector: Optional precomputed embedding of the question
+            
+        Yields:
+            Answer text chunks
+        """
+        if self.answer_cache is not None and query_vector is None:
+            query_vector = self.embed_query(question)
+        cached = self._cached_answer(query_vector)
+        if cached is not None:
+            yield cached["answer"]
+            return
+        
+        retrieved_docs = self._retrieve(question, top_k, query_vector)
+        
+        if not retrieved_docs:
+            yield self._build_result(None, retrieved_docs)["answer"]
+            return
+        
+        parts = []
+        for chunk in self.chain.stream({
+            "context": self._build_context(retrieved_docs),
+            "question": question
+        }):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            parts.append(text)
+            yield text
+        
+        self._remember_answer(query_vector, self._build_result("".join(parts), retrieved_docs))
+    
+    async def aquery(self, question: str, top_k: int = 3, query_vector: Optional[List[float]] = None) -> Dict:
+        """
+        Query the RAG system without blocking the event loop.
+        
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            query_vector: Optional precomputed embedding of the question
+            
+        Returns:
+            Dictionary containing answer and retrieved context
+        """
+        if self.answer_cache is not None and query_vector is None:
+            query_vector = await self.vector_store.aembed_query(question)
+        cached = self._cached_answer(query_vector)
+        if cached is not None:
+            return cached
+        
+        retrieved_docs = await self._aretrieve(question, top_k, query_vector)
+        
+        if not retrieved_docs:
+            return self._build_result(None, retrieved_docs)
+        
+        response = await self.chain.ainvoke({
+            "context": self._build_context(retrieved_docs),
             "question": question
         })
         
-        answer = response.content if hasattr(response, 'content') else str(response)
+        result = self._build_result(response, retrieved_docs)
+        self._remember_answer(query_vector, result)
+        return result
+    
+    async def astream(
+        self,
+        question: str,
+        top_k: int = 3,
+        query_vector: Optional[List[float]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Answer a question without blocking the event loop, yielding the answer as it is generated.
         
-        return {
-            "answer": answer,
-            "sources": [doc["metadata"] for doc in retrieved_docs],
-            "retrieved_chunks": retrieved_docs
-        }
-
+        Args:
+            question: User's question
+            top_k: Number of relevant chunks to retrieve
+            query_vector: Optional precomputed embedding of the question
+            
+        Yields:
+            Answer text chunks
+        """
+        if self.answer_cache is not None and query_vector is None:
+            query_vector = await self.vector_store.aembed_query(question)
+        cached = self._cached_answer(query_vector)
+        if cached is not None:
+            yield cached["answer"]
+            return
+        
+        retrieved_docs = await self._aretrieve(question, top_k, query_vector)
+        
+        if not retrieved_docs:
+            yield self._build_result(None, retrieved_docs)["answer"]
+            return
+        
+        parts = []
+        async for chunk in self.chain.astream({
+            "context": self._build_context(retrieved_docs),
+            "question": question
+        }):
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            parts.append(text)
+            yield text
+        
+        self._remember_answer(query_vector, self._build_result("".join(parts), retrieved_docs))
@@ -0,0 +1,163 @@
+"""Semantic cache for reusing agent responses to near-duplicate queries."""
+import threading
+import time
+from typing import Any, List, Dict, Optional
+import numpy as np
+from vector_store import VectorStore
+from config import (
+    QUERY_CACHE_COLLECTION,
+    SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL,
+    RAG_ANSWER_CACHE_SIZE,
+    RAG_ANSWER_CACHE_THRESHOLD,
+)
+
+
+class SemanticCache:
+    """Cache of agent responses keyed on query embeddings stored in Qdrant."""
+    
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: int = SEMANTIC_CACHE_TTL
+    ):
+        """
+        Initialize SemanticCache with its own Qdrant collection.
+        
+        Args:
+            vector_store: Store on the cache collection; pass
+                documents_store.for_collection(QUERY_CACHE_COLLECTION) to share
+                the app's Qdrant and embeddings clients
+            threshold: Minimum similarity for a lookup to count as a hit
+            ttl: Seconds before an entry expires
+        """
+        self.vector_store = vector_store or VectorStore(collection_name=QUERY_CACHE_COLLECTION)
+        self.threshold = threshold
+        self.ttl = ttl
+    
+    def get(self, query_vector: List[float], revision: Optional[int] = None) -> Optional[Dict]:
+        """
+        Look up a cached response for a query embedding.
+        
+        Args:
+            query_vector: Embedding of the incoming query
+            revision: Current documents revision; RAG answers stored under
+                another revision count as misses
+            
+        Returns:
+            Dictionary with cached response and route, or None on miss
+        """
+        results = self.vector_store.search_by_vector(
+            query_vector,
+            top_k=1,
+            score_threshold=self.threshold
+        )
+        if not results:
+            return None
+        
+        entry = results[0]["metadata"]
+        # Weather answers go stale, so expired entries count as misses
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            return None
+        # RAG answers were grounded in the documents at the time, so any ingest
+        # since then invalidates them
+        if entry["route"] == "rag" and entry.get("revision") != revision:
+            return None
+        
+        return {
+            "response": entry["response"],
+            "route": entry["route"]
+        }
+    
+    def set(self, query: str, query_vector: List[float], result: Dict, revision: Optional[int] = None):
+        """
+        Store an agent result under its query embedding.
+        
+        Args:
+            query: Original query string
+            query_vector: Embedding of the query
+            result: Agent result containing response and route
+            revision: Documents revision the result was generated against
+        """
+        metadata = {
+            "response": result["response"],
+            "route": result["route"],
+            "revision": revision,
+            "created_at": time.time()
+        }
+        self.vector_store.add_documents([query], [metadata], embeddings=[query_vector])
+
+
+class SimilarityLRU:
+    """In-process similarity cache: values keyed on embeddings, least recently used evicted first."""
+    
+    def __init__(self, max_entries: int = RAG_ANSWER_CACHE_SIZE, threshold: float = RAG_ANSWER_CACHE_THRESHOLD):
+        """
+        Initialize SimilarityLRU.
+        
+        Args:
+            max_entries: Maximum number of cached values
+            threshold: Minimum cosine similarity for a lookup to count as a hit
+        """
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        """Drop every cached value."""
+        with self._lock:
+            self._vectors: Optional[np.ndarray] = None  # unit-length rows, allocated on first put
+            self._values: List[Any] = []
+            self._last_used = np.zeros(self.max_entries, dtype=np.int64)
+            self._tick = 0
+    
+    def get(self, query_vector: List[float]) -> Optional[Any]:
+        """
+        Return the value stored under the most similar embedding, if similar enough.
+        
+        Args:
+            query_vector: Embedding to look up
+            
+        Returns:
+            Cached value, or None on miss
+        """
+        with self._lock:
+            if not self._values:
+                return None
+            similarities = self._vectors[:len(self._values)] @ self._normalize(query_vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            self._tick += 1
+            self._last_used[best] = self._tick
+            return self._values[best]
+    
+    def put(self, query_vector: List[float], value: Any):
+        """
+        Store a value under an embedding, evicting the least recently used entry when full.
+        
+        Args:
+            query_vector: Embedding to store the value under
+            value: Value to cache
+        """
+        vector = self._normalize(query_vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.empty((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if len(self._values) < self.max_entries:
+                slot = len(self._values)
+                self._values.append(value)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._values[slot] = value
+            self._vectors[slot] = vector
+            self._tick += 1
+            self._last_used[slot] = self._tick
+    
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        """Scale a vector to unit length so dot products are cosine similarities."""
+        array = np.asarray(vector, dtype=np.float32)
+        return array / (np.linalg.norm(array) or 1.0)
@@ -1,6 +1,7 @@
 """Setup verification script to check if all dependencies and configurations are correct."""
 import sys
 import os
+from importlib import metadata
 
 def check_imports():
     """Check if all required packages can be imported."""
@@ -17,20 +18,35 @@ def check_imports():
         "dotenv",
         "requests",
         "pytest",
-        "openai"
+        "openai",
+        "numpy",
+        "xxhash",
+        "cachetools",
+        "httpx",
+        "orjson"
     ]
     
+    # Reading installed metadata avoids executing each package's (often slow) import
+    installed = metadata.packages_distributions()
+    
     failed = []
     for package in required_packages:
-        try:
-            __import__(package.replace("-", "_"))
+        if package in installed or _can_import(package):
             print(f"  ✓ {package}")
-        except ImportError:
+        else:
             print(f"  ✗ {package} - NOT INSTALLED")
             failed.append(package)
     
     return len(failed) == 0
 
+def _can_import(package):
+    """Fall back to importing packages that metadata doesn't map, e.g. namespace packages."""
+    try:
+        __import__(package)
+        return True
+    except ImportError:
+        return False
+
 def check_env_file():
     """Check if .env file exists and has required keys."""
     print("\nChecking environment configuration...")
@@ -74,16 +90,21 @@ def check_qdrant():
     print("\nChecking Qdrant connection...")
     try:
         from qdrant_client import QdrantClient
-        from config import QDRANT_HOST, QDRANT_PORT
+        from config import QDRANT_HOST, QDRANT_PORT, QDRANT_GRPC_PORT, QDRANT_PREFER_GRPC
         
-        client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+        client = QdrantClient(
+            host=QDRANT_HOST,
+            port=QDRANT_PORT,
+            grpc_port=QDRANT_GRPC_PORT,
+            prefer_grpc=QDRANT_PREFER_GRPC
+        )
         collections = client.get_collections()
         print(f"  ✓ Qdrant connected at {QDRANT_HOST}:{QDRANT_PORT}")
         print(f"  → Found {len(collections.collections)} collection(s)")
         return True
     except Exception as e:
         print(f"  ✗ Qdrant connection failed: {str(e)}")
-        print("  → Make sure Qdrant is running (docker run -p 6333:6333 qdrant/qdrant)")
+        print("  → Make sure Qdrant is running (docker run -p 6333:6333 -p 6334:6334 qdrant/qdrant)")
         return False
 
 def main():
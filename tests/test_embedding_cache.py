@@ -0,0 +1,50 @@
+"""Unit tests for EmbeddingCache."""
+import pytest
+from embedding_cache import EmbeddingCache
+
+
+class TestEmbeddingCache:
+    """Test cases for EmbeddingCache."""
+    
+    def test_normalized_query_hits(self):
+        """Test that case and surrounding whitespace don't cause misses."""
+        cache = EmbeddingCache("test-model", path=None)
+        cache.set("What is RAG?", [0.1, 0.2])
+        
+        assert cache.get("  what is rag?  ") == [0.1, 0.2]
+        assert cache.get("What is a RAG?") is None
+    
+    def test_model_is_part_of_key(self):
+        """Test that another model never reads this model's vectors."""
+        cache = EmbeddingCache("test-model", path=None)
+        cache.set("query", [1.0])
+        
+        assert EmbeddingCache("other-model", path=None).get("query") is None
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = EmbeddingCache("test-model", max_entries=2, path=None)
+        cache.set("a", [1.0])
+        cache.set("b", [2.0])
+        cache.get("a")
+        cache.set("c", [3.0])
+        
+        assert cache.get("a") == [1.0]
+        assert cache.get("b") is None
+    
+    def test_persists_across_instances(self, tmp_path):
+        """Test that embeddings survive a restart via the SQLite file."""
+        path = str(tmp_path / "cache" / "embeddings.sqlite3")
+        EmbeddingCache("test-model", path=path).set("query", [0.5, 0.25])
+        
+        assert EmbeddingCache("test-model", path=path).get("query") == pytest.approx([0.5, 0.25])
+    
+    def test_document_embeddings_persist(self, tmp_path):
+        """Test that document embeddings are served from SQLite on re-ingest."""
+        path = str(tmp_path / "embeddings.sqlite3")
+        EmbeddingCache("test-model", path=path).set_documents(["chunk a", "chunk b"], [[1.0], [2.0]])
+        
+        cache = EmbeddingCache("test-model", path=path)
+        
+        assert cache.get_documents(["chunk b", "chunk c", "chunk a"]) == [[2.0], None, [1.0]]
+        assert EmbeddingCache("other-model", path=path).get_documents(["chunk a"]) == [None]
@@ -0,0 +1,69 @@
+"""Unit tests for ResponseEvaluator."""
+import pytest
+from evaluator import ResponseEvaluator
+
+
+class TestResponseEvaluator:
+    """Test cases for ResponseEvaluator's quality heuristics."""
+    
+    @pytest.fixture
+    def evaluator(self):
+        """Create a ResponseEvaluator without a LangSmith client."""
+        return ResponseEvaluator()
+    
+    def test_good_weather_response(self, evaluator):
+        """Test that an on-topic weather answer gets full marks."""
+        result = evaluator._evaluate_quality(
+            "weather in London",
+            "The weather in London is cloudy with a temperature of 12°C.",
+            "weather"
+        )
+        
+        assert result["score"] == pytest.approx(1.0)
+        assert result["comment"] == "Good response"
+    
+    def test_error_response(self, evaluator):
+        """Test that error indicators and missing overlap are penalized."""
+        result = evaluator._evaluate_quality("weather in Paris", "Request failed.", "weather")
+        
+        assert result["score"] == pytest.approx(0.3)
+        assert "Response may not address query" in result["comment"]
+        assert "Response contains error indicators" in result["comment"]
+    
+    def test_apology_is_not_penalized(self, evaluator):
+        """Test that an apology still earns the error-indicator credit."""
+        result = evaluator._evaluate_quality(
+            "what is the refund policy?",
+            "Sorry, I couldn't find the refund policy in the documents.",
+            "rag"
+        )
+        
+        assert result["score"] == pytest.approx(1.0)
+    
+    def test_overlapping_indicators_all_found(self, evaluator):
+        """Test that a keyword running into the next group's keyword doesn't hide it."""
+        assert evaluator._find_indicators("the temperaturerror reading") == {"weather", "error"}
+        assert evaluator._find_indicators("we couldn'temperature") == {"error", "weather"}
+    
+    def test_evaluate_batch_matches_single_calls(self, evaluator):
+        """Test that batch scoring equals scoring each response on its own."""
+        queries = ["weather in London", "weather in Paris"]
+        responses = ["The weather in London is cloudy, 12°C.", "Request failed."]
+        routes = ["weather", "weather"]
+        
+        assert evaluator.evaluate_batch(queries, responses, routes) == [
+            evaluator._evaluate_quality(q, r, route) for q, r, route in zip(queries, responses, routes)
+        ]
+    
+    def test_response_lowercased_once(self, evaluator):
+        """Test that every heuristic shares a single lowercased copy of the response."""
+        class CountingStr(str):
+            lower_calls = 0
+            
+            def lower(self):
+                CountingStr.lower_calls += 1
+                return super().lower()
+        
+        evaluator._evaluate_quality("weather in Oslo", CountingStr("Sorry, the weather in Oslo is unavailable."), "weather")
+        
+        assert CountingStr.lower_calls == 1
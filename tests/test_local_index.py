@@ -0,0 +1,33 @@
+"""Unit tests for LocalIndex."""
+from local_index import LocalIndex
+
+
+class TestLocalIndex:
+    """Test cases for LocalIndex."""
+    
+    def test_search_ranks_by_dot_product(self):
+        """Test that results come back best first, cut at top_k and the threshold."""
+        index = LocalIndex()
+        index.upsert([1, 2, 3], [[1.0, 0.0], [0.6, 0.8], [0.0, 1.0]], [{"text": "a"}, {"text": "b"}, {"text": "c"}])
+        
+        hits = index.search([1.0, 0.0], top_k=2)
+        
+        assert [payload["text"] for payload, _ in hits] == ["a", "b"]
+        assert [payload["text"] for payload, _ in index.search([1.0, 0.0], top_k=3, score_threshold=0.5)] == ["a", "b"]
+    
+    def test_upsert_overwrites_same_id(self):
+        """Test that re-upserting an ID replaces its vector and payload, as Qdrant does."""
+        index = LocalIndex()
+        index.upsert([1], [[1.0, 0.0]], [{"text": "old"}])
+        index.upsert([1], [[0.0, 1.0]], [{"text": "new"}])
+        
+        assert len(index) == 1
+        assert index.search([0.0, 1.0], top_k=1)[0][0] == {"text": "new"}
+    
+    def test_grows_past_initial_capacity(self):
+        """Test that the matrix grows without losing earlier rows."""
+        index = LocalIndex()
+        index.upsert(list(range(100)), [[1.0, float(i)] for i in range(100)], [{"i": i} for i in range(100)])
+        
+        assert len(index) == 100
+        assert index.search([0.0, 1.0], top_k=1)[0][0] == {"i": 99}
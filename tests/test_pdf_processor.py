@@ -0,0 +1,43 @@
+"""Unit tests for PDFProcessor."""
+import io
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+from pypdf import PageObject, PdfWriter
+from pdf_processor import PDFProcessor
+
+
+class TestPDFProcessor:
+    """Test cases for PDFProcessor."""
+    
+    def test_fontless_pages_are_not_decoded(self):
+        """Test that pages without fonts are skipped rather than parsed for text."""
+        writer = PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=100, height=100)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        
+        with patch.object(PageObject, "extract_text") as mock_extract:
+            text = PDFProcessor().extract_text_from_bytes(buffer.getvalue())
+        
+        assert text == ""
+        mock_extract.assert_not_called()
+    
+    def test_broken_pool_falls_back_to_serial(self):
+        """Test that a broken worker pool is discarded and the document still extracts."""
+        writer = PdfWriter()
+        for _ in range(4):
+            writer.add_blank_page(width=100, height=100)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        broken = MagicMock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        
+        with patch("pdf_processor.PDF_PARALLEL_MIN_PAGES", 2), \
+                patch("pdf_processor.PDF_MAX_WORKERS", 2), \
+                patch("pdf_processor._get_executor") as mock_get_executor:
+            mock_get_executor.return_value = broken
+            text = PDFProcessor().extract_text_from_bytes(buffer.getvalue())
+        
+        assert text == ""
+        mock_get_executor.cache_clear.assert_called_once()
@@ -2,6 +2,7 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from rag_service import RAGService
+from semantic_cache import SimilarityLRU
 from vector_store import VectorStore
 
 
@@ -34,8 +35,8 @@ class TestRAGService:
         # Mock LLM response
         mock_response = Mock()
         mock_response.content = "Based on the document, AI is a test topic."
-        rag_service.llm = Mock()
-        rag_service.llm.invoke = Mock(return_value=mock_response)
+        rag_service.chain = Mock()
+        rag_service.chain.invoke = Mock(return_value=mock_response)
         
         # Test
         result = rag_service.query("What is AI?")
@@ -57,3 +58,81 @@ class TestRAGService:
         assert "couldn't find" in result["answer"].lower()
         assert len(result["sources"]) == 0
 
+    
+    def test_stream(self, rag_service, mock_vector_store):
+        """Test that the answer is yielded as the LLM streams it."""
+        from langchain_core.language_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        
+        mock_vector_store.search.return_value = [
+            {"text": "AI doc", "metadata": {"source": "test.pdf"}, "score": 0.9}
+        ]
+        rag_service.chain = rag_service.prompt_template | GenericFakeChatModel(messages=iter([AIMessage(content="AI is a topic")]))
+        
+        chunks = list(rag_service.stream("What is AI?"))
+        
+        assert len(chunks) > 1
+        assert "".join(chunks) == "AI is a topic"
+    
+    def test_prompt_prefix_is_stable(self, rag_service):
+        """Test that only the trailing message varies between queries."""
+        first = rag_service.prompt_template.format_messages(context="A", question="Q1?")
+        second = rag_service.prompt_template.format_messages(context="B", question="Q2?")
+        
+        assert first[0].content == second[0].content
+        assert first[-1].content.endswith("Question: Q1?")
+    
+    def test_build_context_drops_duplicate_chunks(self, rag_service):
+        """Test that identical chunk texts appear once, in document order."""
+        docs = [
+            {"text": "second", "metadata": {"source": "a.pdf", "chunk_index": 1}},
+            {"text": "first", "metadata": {"source": "a.pdf", "chunk_index": 0}},
+            {"text": "first", "metadata": {"source": "b.pdf", "chunk_index": 3}},
+        ]
+        
+        assert rag_service._build_context(docs) == "first\n\n---\n\nsecond"
+    
+    def test_answer_cache_skips_llm_until_documents_change(self, mock_vector_store):
+        """Test that a near-identical question reuses the answer until the store is written to."""
+        from langchain_core.messages import AIMessage
+        from langchain_core.runnables import RunnableLambda
+        
+        with patch('rag_service.ChatOpenAI'):
+            rag_service = RAGService(mock_vector_store, answer_cache=SimilarityLRU(max_entries=4, threshold=0.95))
+        mock_vector_store.revision = 0
+        mock_vector_store.search_by_vector.return_value = [
+            {"text": "AI doc", "metadata": {"source": "test.pdf"}, "score": 0.9}
+        ]
+        llm = Mock(side_effect=lambda prompt: AIMessage(content="AI answer"))
+        rag_service.chain = rag_service.prompt_template | RunnableLambda(llm)
+        
+        rag_service.query("What is AI?", query_vector=[1.0, 0.0])
+        cached = rag_service.query("what is AI", query_vector=[0.99, 0.01])
+        
+        assert cached["answer"] == "AI answer"
+        assert llm.call_count == 1
+        
+        mock_vector_store.revision = 1
+        rag_service.query("what is AI", query_vector=[0.99, 0.01])
+        
+        assert llm.call_count == 2
+    
+    def test_astream(self, rag_service, mock_vector_store):
+        """Test that the async path retrieves and streams without the sync client."""
+        import asyncio
+        from langchain_core.language_models import GenericFakeChatModel
+        from langchain_core.messages import AIMessage
+        
+        mock_vector_store.asearch.return_value = [
+            {"text": "AI doc", "metadata": {"source": "test.pdf"}, "score": 0.9}
+        ]
+        rag_service.chain = rag_service.prompt_template | GenericFakeChatModel(messages=iter([AIMessage(content="AI is a topic")]))
+        
+        async def collect():
+            return [chunk async for chunk in rag_service.astream("What is AI?")]
+        
+        chunks = asyncio.run(collect())
+        
+        assert "".join(chunks) == "AI is a topic"
+        mock_vector_store.asearch.assert_awaited_once_with("What is AI?", top_k=3)
+        mock_vector_store.search.assert_not_called()
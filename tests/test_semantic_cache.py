@@ -0,0 +1,36 @@
+"""Unit tests for SemanticCache."""
+import time
+from unittest.mock import MagicMock
+from semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache."""
+    
+    def _cache_with_entry(self, route, revision):
+        """Create a SemanticCache whose store returns a single fresh entry."""
+        vector_store = MagicMock()
+        vector_store.search_by_vector.return_value = [{
+            "text": "query",
+            "metadata": {
+                "response": "cached",
+                "route": route,
+                "revision": revision,
+                "created_at": time.time()
+            },
+            "score": 0.99
+        }]
+        return SemanticCache(vector_store=vector_store)
+    
+    def test_rag_entry_stale_after_ingest(self):
+        """Test that RAG answers from an older documents revision are misses."""
+        cache = self._cache_with_entry("rag", revision=1)
+        
+        assert cache.get([1.0, 0.0], revision=1) == {"response": "cached", "route": "rag"}
+        assert cache.get([1.0, 0.0], revision=2) is None
+    
+    def test_weather_entry_ignores_revision(self):
+        """Test that weather answers don't depend on the documents revision."""
+        cache = self._cache_with_entry("weather", revision=None)
+        
+        assert cache.get([1.0, 0.0], revision=2) == {"response": "cached", "route": "weather"}
@@ -0,0 +1,171 @@
+"""Unit tests for VectorStore."""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from vector_store import VectorStore
+
+
+class TestVectorStore:
+    """Test cases for VectorStore."""
+    
+    @contextmanager
+    def _mirrored_store(self, points, threshold=2):
+        """Build a VectorStore whose mocked collection holds points; yields (store, mock client)."""
+        client = MagicMock()
+        client.count.return_value = SimpleNamespace(count=len(points))
+        client.scroll.return_value = (points, None)
+        with patch('vector_store.LOCAL_SEARCH_THRESHOLD', threshold), \
+                patch('vector_store.OpenAIEmbeddings'):
+            yield VectorStore(client=client, embedding_cache=MagicMock()), client
+    
+    def _point(self, point_id, vector, payload):
+        """A scrolled Qdrant point."""
+        return SimpleNamespace(id=point_id, vector=vector, payload=payload)
+    
+    def test_small_collection_loaded_and_searched_locally(self):
+        """Test that a collection under the threshold is mirrored at startup and searched without Qdrant."""
+        points = [
+            self._point(1, [1.0, 0.0], {"text": "north", "meta": {"source": "a.pdf"}}),
+            self._point(2, [0.0, 1.0], {"text": "east", "meta": {"source": "b.pdf"}}),
+        ]
+        with self._mirrored_store(points) as (store, client):
+            results = store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        assert results == [{"text": "north", "metadata": {"source": "a.pdf"}, "score": 1.0}]
+        client.query_points.assert_not_called()
+    
+    def test_large_collection_searches_qdrant(self):
+        """Test that a collection over the threshold isn't mirrored and searches go to Qdrant."""
+        points = [self._point(idx, [1.0, 0.0], {"text": str(idx), "meta": {}}) for idx in range(3)]
+        with self._mirrored_store(points) as (store, client):
+            client.query_points.return_value.points = [
+                SimpleNamespace(payload={"text": "0", "meta": {}}, score=0.9)
+            ]
+            results = store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        client.scroll.assert_not_called()
+        client.query_points.assert_called_once()
+        assert results == [{"text": "0", "metadata": {}, "score": 0.9}]
+    
+    def test_mirror_dropped_once_past_threshold(self):
+        """Test that upserts growing the collection past the threshold fall back to Qdrant."""
+        with self._mirrored_store([]) as (store, client):
+            store.add_documents(["one", "two"], embeddings=[[1.0, 0.0], [0.0, 1.0]])
+            store.search_by_vector([1.0, 0.0], top_k=1)
+            client.query_points.assert_not_called()
+            
+            store.add_documents(["three"], embeddings=[[0.6, 0.8]])
+            client.query_points.return_value.points = []
+            store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        assert store._local_index is None
+        client.query_points.assert_called_once()
+    
+    def test_legacy_flat_payload_metadata(self):
+        """Test that points stored before the "meta" key still return their metadata."""
+        points = [self._point(1, [1.0, 0.0], {"text": "old", "source": "legacy.pdf", "chunk_index": 0})]
+        with self._mirrored_store(points) as (store, _):
+            results = store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        assert results[0]["metadata"] == {"source": "legacy.pdf", "chunk_index": 0}
+    
+    def test_result_metadata_is_a_copy(self):
+        """Test that mutating returned metadata doesn't change the mirrored payload."""
+        points = [self._point(1, [1.0, 0.0], {"text": "north", "meta": {"source": "a.pdf"}})]
+        with self._mirrored_store(points) as (store, _):
+            store.search_by_vector([1.0, 0.0], top_k=1)[0]["metadata"]["source"] = "changed"
+            results = store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        assert results[0]["metadata"] == {"source": "a.pdf"}
+    
+    def test_clear_collection_resets_mirror(self):
+        """Test that clearing the collection empties the local mirror and bumps the revision."""
+        points = [self._point(1, [1.0, 0.0], {"text": "north", "meta": {}})]
+        with self._mirrored_store(points) as (store, client):
+            revision = store.revision
+            store.clear_collection()
+            results = store.search_by_vector([1.0, 0.0], top_k=1)
+        
+        client.delete_collection.assert_called_once()
+        assert results == []
+        assert store.revision == revision + 1
+        client.query_points.assert_not_called()
+    
+    @contextmanager
+    def _patched_store(self, aembed_documents):
+        """Build a VectorStore on mocked clients; yields (store, async Qdrant clients, embeddings class)."""
+        async_qdrant_clients = []
+        
+        def make_async_qdrant(**kwargs):
+            client = AsyncMock()
+            async_qdrant_clients.append(client)
+            return client
+        
+        with patch('vector_store.LOCAL_SEARCH_THRESHOLD', 0), \
+                patch('vector_store.QdrantClient'), \
+                patch('vector_store.AsyncQdrantClient', side_effect=make_async_qdrant), \
+                patch('vector_store.OpenAIEmbeddings') as mock_embeddings:
+            mock_embeddings.side_effect = lambda **kwargs: MagicMock(
+                aembed_documents=AsyncMock(side_effect=aembed_documents)
+            )
+            embedding_cache = MagicMock()
+            embedding_cache.get_documents.side_effect = lambda texts: [None] * len(texts)
+            store = VectorStore(embedding_cache=embedding_cache)
+            store._upsert = MagicMock()
+            yield store, async_qdrant_clients, mock_embeddings
+    
+    def test_async_clients_are_per_event_loop(self):
+        """Test that each asyncio.run gets fresh async clients and closes them before the loop ends."""
+        embed = lambda texts: [[1.0, 0.0]] * len(texts)
+        with self._patched_store(embed) as (store, async_qdrant_clients, mock_embeddings):
+            store.add_documents(["first"])
+            store.add_documents(["second"])
+        
+        assert len(async_qdrant_clients) == 2
+        for client in async_qdrant_clients:
+            client.close.assert_awaited_once()
+        # One embeddings model for sync calls, plus one per event loop on its own HTTP client
+        assert mock_embeddings.call_count == 3
+        assert all(call.kwargs.get("http_async_client") for call in mock_embeddings.call_args_list[1:])
+        assert len(store._async_clients) == 0
+        assert store._upsert.call_count == 2
+    
+    def test_concurrent_uploads_keep_their_own_clients(self):
+        """Test that an upload on another loop never closes clients still in use."""
+        second_done = threading.Event()
+        store_ref = {}
+        
+        async def aembed_documents(texts):
+            if texts == ["first"]:
+                # Hold the first upload open until the second has run start to finish
+                await asyncio.to_thread(second_done.wait, 5)
+            clients = store_ref["store"]._async_clients[asyncio.get_running_loop()]
+            clients.qdrant.close.assert_not_awaited()
+            return [[1.0, 0.0]] * len(texts)
+        
+        with self._patched_store(aembed_documents) as (store, async_qdrant_clients, _):
+            store_ref["store"] = store
+            errors = []
+            
+            def upload(text):
+                try:
+                    store.add_documents([text])
+                except Exception as e:
+                    errors.append(e)
+            
+            first = threading.Thread(target=upload, args=("first",))
+            first.start()
+            while not async_qdrant_clients:
+                time.sleep(0.01)
+            upload("second")
+            second_done.set()
+            first.join(timeout=5)
+        
+        assert errors == []
+        assert len(async_qdrant_clients) == 2
+        for client in async_qdrant_clients:
+            client.close.assert_awaited_once()
+        assert store._upsert.call_count == 2
@@ -1,4 +1,5 @@
 """Unit tests for WeatherService."""
+import json
 import pytest
 from unittest.mock import Mock, patch
 from weather_service import WeatherService
@@ -12,7 +13,7 @@ class TestWeatherService:
         """Create a WeatherService instance for testing."""
         return WeatherService(api_key="test_api_key")
     
-    @patch('weather_service.requests.get')
+    @patch.object(WeatherService._session, 'get')
     def test_get_weather_success(self, mock_get, weather_service):
         """Test successful weather data retrieval."""
         # Mock API response
@@ -30,6 +31,7 @@ class TestWeatherService:
             "wind": {"speed": 3.5},
             "visibility": 10000
         }
+        mock_response.content = json.dumps(mock_response.json.return_value).encode()
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
         
@@ -43,7 +45,7 @@ class TestWeatherService:
         assert result["description"] == "clear sky"
         mock_get.assert_called_once()
     
-    @patch('weather_service.requests.get')
+    @patch.object(WeatherService._session, 'get')
     def test_get_weather_api_error(self, mock_get, weather_service):
         """Test handling of API errors."""
         # Mock API error
@@ -77,3 +79,24 @@ class TestWeatherService:
         assert "clear sky" in result
         assert "65%" in result
 
+    
+    @patch.object(WeatherService._session, 'get')
+    def test_get_weather_is_cached(self, mock_get, weather_service):
+        """Test that repeat lookups are served from the cache until invalidated."""
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            "name": "London",
+            "sys": {"country": "GB"},
+            "main": {"temp": 15.5, "feels_like": 14.2, "humidity": 65, "pressure": 1013},
+            "weather": [{"description": "clear sky"}]
+        }
+        mock_response.content = json.dumps(mock_response.json.return_value).encode()
+        mock_get.return_value = mock_response
+        
+        weather_service.get_weather("London")
+        weather_service.get_weather(" london ")
+        assert mock_get.call_count == 1
+        
+        weather_service.invalidate("London")
+        weather_service.get_weather("London")
+        assert mock_get.call_count == 2
@@ -1,24 +1,170 @@
 """Vector store implementation using Qdrant for storing and retrieving embeddings."""
-import hashlib
-from typing import List, Dict, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+import asyncio
+import threading
+import weakref
+from typing import List, Dict, NamedTuple, Optional, Tuple, Union
+import httpx
+import numpy as np
+import xxhash
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    HnswConfigDiff,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+)
 from langchain_openai import OpenAIEmbeddings
-from config import QDRANT_HOST, QDRANT_PORT, QDRANT_COLLECTION_NAME, EMBEDDING_MODEL, OPENAI_API_KEY
+from embedding_cache import EmbeddingCache
+from local_index import LocalIndex
+from config import (
+    QDRANT_HOST,
+    QDRANT_PORT,
+    QDRANT_GRPC_PORT,
+    QDRANT_PREFER_GRPC,
+    QDRANT_COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    OPENAI_API_KEY,
+    EMBED_BATCH_SIZE,
+    EMBED_MAX_WORKERS,
+    EMBED_MAX_RETRIES,
+    QDRANT_QUANTIZATION_ENABLED,
+    QDRANT_QUANTIZATION_TYPE,
+    QDRANT_HNSW_M,
+    QDRANT_HNSW_EF_CONSTRUCT,
+    QDRANT_RESCORE_CANDIDATES,
+    LOCAL_SEARCH_THRESHOLD,
+)
+
+
+def _unit_vectors(vectors: List[List[float]]) -> List[List[float]]:
+    """Return vectors scaled to unit length; already-normalized input is returned as is."""
+    # OpenAI embeddings are unit-norm; this only guards against a model that isn't
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    if np.allclose(norms, 1.0, atol=1e-3):
+        return vectors
+    return (matrix / np.where(norms == 0, 1.0, norms)).tolist()
+
+
+class _AsyncClients(NamedTuple):
+    """Async clients opened on one event loop; their connections can't be used from another."""
+    qdrant: AsyncQdrantClient
+    embeddings: OpenAIEmbeddings
+    http_client: httpx.AsyncClient
 
 
 class VectorStore:
     """Vector store for managing embeddings in Qdrant."""
     
-    def __init__(self, collection_name: Optional[str] = None):
-        """Initialize VectorStore with Qdrant client and embeddings model."""
-        self.client = QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
+    # Bumped on every write or clear so caches of derived answers know to invalidate
+    revision = 0
+    
+    def __init__(
+        self,
+        collection_name: Optional[str] = None,
+        client: Optional[QdrantClient] = None,
+        embeddings: Optional[OpenAIEmbeddings] = None,
+        embedding_cache: Optional[EmbeddingCache] = None
+    ):
+        """
+        Initialize VectorStore with Qdrant client and embeddings model.
+        
+        Args:
+            collection_name: Collection to use; defaults to QDRANT_COLLECTION_NAME
+            client: Existing Qdrant client to share instead of opening a new connection
+            embeddings: Existing embeddings model to share
+            embedding_cache: Existing embedding cache to share
+        """
+        self.client = client or QdrantClient(**self._connection_params())
+        # Created on first async use, once per event loop
+        # The app shares one store across sessions, each upload on its own loop
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncClients]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._async_clients_lock = threading.Lock()
         self.collection_name = collection_name or QDRANT_COLLECTION_NAME
-        self.embeddings = OpenAIEmbeddings(
+        self.embeddings = embeddings or self._build_embeddings()
+        self.embedding_cache = embedding_cache or EmbeddingCache(EMBEDDING_MODEL)
+        self._ensure_collection()
+        # Assumes this process is the collection's only writer, which holds for the app
+        self._local_index = self._load_local_index()
+    
+    def for_collection(self, collection_name: str) -> "VectorStore":
+        """Return a store on another collection that shares this store's clients and caches."""
+        return VectorStore(
+            collection_name=collection_name,
+            client=self.client,
+            embeddings=self.embeddings,
+            embedding_cache=self.embedding_cache
+        )
+    
+    @staticmethod
+    def _connection_params() -> Dict:
+        """Connection settings shared by the sync and async Qdrant clients."""
+        return {
+            "host": QDRANT_HOST,
+            "port": QDRANT_PORT,
+            "grpc_port": QDRANT_GRPC_PORT,
+            "prefer_grpc": QDRANT_PREFER_GRPC,
+        }
+    
+    @staticmethod
+    def _build_embeddings(**kwargs) -> OpenAIEmbeddings:
+        """Create the embeddings model; kwargs are passed through to OpenAIEmbeddings."""
+        return OpenAIEmbeddings(
             model=EMBEDDING_MODEL,
-            openai_api_key=OPENAI_API_KEY
+            openai_api_key=OPENAI_API_KEY,
+            chunk_size=EMBED_BATCH_SIZE,
+            max_retries=EMBED_MAX_RETRIES,  # the OpenAI SDK backs off exponentially on 429s
+            **kwargs
         )
-        self._ensure_collection()
+    
+    def _get_async_clients(self) -> Tuple[AsyncQdrantClient, OpenAIEmbeddings]:
+        """
+        Return the async Qdrant client and embeddings bound to the running event loop.
+        
+        Both hold connections tied to the loop that opened them, so each loop
+        (every asyncio.run, for instance) gets its own pair instead of failing with
+        "Event loop is closed". Other loops' clients are never touched, since
+        concurrent sessions may still be using them.
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                http_client = httpx.AsyncClient()
+                clients = _AsyncClients(
+                    AsyncQdrantClient(**self._connection_params()),
+                    self._build_embeddings(http_async_client=http_client),
+                    http_client
+                )
+                self._async_clients[loop] = clients
+        return clients.qdrant, clients.embeddings
+    
+    @staticmethod
+    async def _close_async_clients(clients: _AsyncClients):
+        """Close one loop's async connections; must run on that loop."""
+        await clients.qdrant.close()
+        await clients.http_client.aclose()
+    
+    async def aclose(self):
+        """
+        Close the async clients opened on the running event loop.
+        
+        Await this before a short-lived loop (such as one started by asyncio.run)
+        finishes; the next async call on another loop opens fresh clients.
+        """
+        with self._async_clients_lock:
+            clients = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if clients is not None:
+            await self._close_async_clients(clients)
     
     def _ensure_collection(self):
         """Ensure the collection exists, create if it doesn't."""
@@ -31,54 +177,229 @@ class VectorStore:
                     collection_name=self.collection_name,
                     vectors_config=VectorParams(
                         size=1536,  # OpenAI text-embedding-3-small dimension
-                        distance=Distance.COSINE
-                    )
+                        # Vectors are stored unit-length, so dot product equals cosine
+                        # similarity without Qdrant re-normalizing on every search
+                        distance=Distance.DOT
+                    ),
+                    hnsw_config=HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT),
+                    quantization_config=self._quantization_config()
                 )
         except Exception as e:
             raise Exception(f"Failed to ensure collection exists: {str(e)}")
     
-    def add_documents(self, texts: List[str], metadatas: Optional[List[Dict]] = None):
+    def _load_local_index(self) -> Optional[LocalIndex]:
+        """Mirror the collection in RAM when it is small enough to search locally."""
+        if LOCAL_SEARCH_THRESHOLD <= 0:
+            return None
+        try:
+            if self.client.count(self.collection_name, exact=True).count > LOCAL_SEARCH_THRESHOLD:
+                return None
+            
+            index = LocalIndex()
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+                index.upsert(
+                    [point.id for point in points],
+                    _unit_vectors([point.vector for point in points]) if points else [],
+                    [point.payload for point in points]
+                )
+                if offset is None:
+                    return index
+        except Exception as e:
+            raise Exception(f"Failed to load collection into memory: {str(e)}")
+    
+    def _quantization_config(self) -> Optional[Union[ScalarQuantization, BinaryQuantization]]:
+        """Quantization for new collections: int8 scalar by default, binary when configured; kept in RAM."""
+        if not QDRANT_QUANTIZATION_ENABLED:
+            return None
+        if QDRANT_QUANTIZATION_TYPE == "binary":
+            # 1 bit per dimension (32x smaller) for very large corpora; relies on rescoring
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, always_ram=True)
+        )
+    
+    def _search_params(self, top_k: int) -> Optional[SearchParams]:
+        """Rescore quantized candidates with the original float32 vectors."""
+        if not QDRANT_QUANTIZATION_ENABLED:
+            return None
+        # Oversample so at least QDRANT_RESCORE_CANDIDATES candidates get an exact rescore
+        return SearchParams(
+            quantization=QuantizationSearchParams(
+                rescore=True,
+                oversampling=max(1.0, QDRANT_RESCORE_CANDIDATES / top_k)
+            )
+        )
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embed a query string with the store's embeddings model.
+        
+        Args:
+            query: Query text to embed
+            
+        Returns:
+            Query embedding vector
+        """
+        # Repeated questions skip the embedding round-trip entirely
+        vector = self.embedding_cache.get(query)
+        if vector is None:
+            vector = self.embeddings.embed_query(query)
+            self.embedding_cache.set(query, vector)
+        return vector
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """
+        Embed a query string without blocking the event loop.
+        
+        Args:
+            query: Query text to embed
+            
+        Returns:
+            Query embedding vector
+        """
+        vector = self.embedding_cache.get(query)
+        if vector is None:
+            _, embeddings = self._get_async_clients()
+            vector = await embeddings.aembed_query(query)
+            self.embedding_cache.set(query, vector)
+        return vector
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a batch of texts with the store's embeddings model.
+        
+        Args:
+            texts: Texts to embed
+            
+        Returns:
+            One embedding vector per text
+        """
+        return self.embeddings.embed_documents(texts)
+    
+    def add_documents(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ):
         """
         Add documents to the vector store.
         
+        Synchronous wrapper around add_documents_async; async callers should
+        await that directly.
+        
         Args:
             texts: List of text chunks to add
             metadatas: Optional list of metadata dictionaries for each text
+            embeddings: Optional precomputed embeddings, one per text
         """
         if not texts:
             return
         
-        # Generate embeddings
-        embeddings_list = self.embeddings.embed_documents(texts)
+        if embeddings is not None:
+            self._upsert(texts, metadatas, embeddings)
+            return
+        
+        asyncio.run(self._add_documents_and_close(texts, metadatas))
+    
+    async def _add_documents_and_close(self, texts: List[str], metadatas: Optional[List[Dict]]):
+        """Run add_documents_async, then close the clients of this one-off event loop."""
+        try:
+            await self.add_documents_async(texts, metadatas)
+        finally:
+            await self.aclose()
+    
+    async def add_documents_async(self, texts: List[str], metadatas: Optional[List[Dict]] = None):
+        """
+        Embed and add documents, issuing the embedding requests concurrently.
+        
+        Args:
+            texts: List of text chunks to add
+            metadatas: Optional list of metadata dictionaries for each text
+        """
+        if not texts:
+            return
         
+        # Reuse stored embeddings for unchanged chunks; only new text costs an API call
+        embeddings_list = await asyncio.to_thread(self.embedding_cache.get_documents, texts)
+        missing = [idx for idx, vector in enumerate(embeddings_list) if vector is None]
+        
+        # Embed the misses in API-sized batches, at most EMBED_MAX_WORKERS requests in flight
+        semaphore = asyncio.Semaphore(EMBED_MAX_WORKERS)
+        _, embeddings = self._get_async_clients()
+        
+        async def embed_batch(batch_idxs: List[int]):
+            batch = [texts[idx] for idx in batch_idxs]
+            async with semaphore:
+                embedded = await embeddings.aembed_documents(batch)
+            for idx, vector in zip(batch_idxs, embedded):
+                embeddings_list[idx] = vector
+            await asyncio.to_thread(self.embedding_cache.set_documents, batch, embedded)
+        
+        await asyncio.gather(*(
+            embed_batch(missing[start:start + EMBED_BATCH_SIZE])
+            for start in range(0, len(missing), EMBED_BATCH_SIZE)
+        ))
+        await asyncio.to_thread(self._upsert, texts, metadatas, embeddings_list)
+    
+    def _upsert(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[Dict]],
+        embeddings_list: List[List[float]]
+    ):
+        """Upsert texts with their embeddings and metadata."""
         # Prepare points with unique IDs
         points = []
-        for idx, (text, embedding) in enumerate(zip(texts, embeddings_list)):
+        for idx, (text, embedding) in enumerate(zip(texts, _unit_vectors(embeddings_list))):
             metadata = metadatas[idx] if metadatas else {}
-            metadata["text"] = text
             
-            # Generate unique integer ID using hash of text
-            # This ensures same text gets same ID (idempotent)
-            text_hash = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
-            # Add index to ensure uniqueness even for identical texts
-            point_id = text_hash + idx
+            # Full 64-bit non-cryptographic hash of the text as a uint64 point ID;
+            # the same text always maps to the same point (idempotent re-ingest)
+            point_id = xxhash.xxh3_64_intdigest(text.encode("utf-8"))
             
             points.append(
                 PointStruct(
                     id=point_id,
                     vector=embedding,
-                    payload=metadata
+                    payload={"text": text, "meta": metadata}
                 )
             )
         
-        # Upsert points
+        # Upload points; the client streams them in batches and waits so the
+        # points are searchable as soon as this returns
         try:
-            self.client.upsert(
+            self.client.upload_points(
                 collection_name=self.collection_name,
-                points=points
+                points=points,
+                wait=True
             )
+            self.revision += 1
         except Exception as e:
             raise Exception(f"Failed to add documents to vector store: {str(e)}")
+        
+        self._mirror_points(points)
+    
+    def _mirror_points(self, points: List[PointStruct]):
+        """Apply upserted points to the local mirror, dropping it once the collection outgrows it."""
+        local_index = self._local_index
+        if local_index is None:
+            return
+        local_index.upsert(
+            [point.id for point in points],
+            [point.vector for point in points],
+            [point.payload for point in points]
+        )
+        if len(local_index) > LOCAL_SEARCH_THRESHOLD:
+            self._local_index = None
     
     def search(self, query: str, top_k: int = 5) -> List[Dict]:
         """
@@ -92,34 +413,125 @@ class VectorStore:
             List of dictionaries containing text and metadata
         """
         # Generate query embedding
-        query_embedding = self.embeddings.embed_query(query)
+        query_embedding = self.embed_query(query)
+        return self.search_by_vector(query_embedding, top_k=top_k)
+    
+    def search_by_vector(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Search for similar documents using a precomputed query embedding.
+        
+        Args:
+            query_vector: Query embedding vector
+            top_k: Number of results to return
+            score_threshold: Optional minimum similarity score, applied by Qdrant
+            
+        Returns:
+            List of dictionaries containing text and metadata
+        """
+        query_vector = _unit_vectors([query_vector])[0]
+        local_index = self._local_index
+        if local_index is not None:
+            # Exact in-process search; no round-trip for small collections
+            return self._format_results(local_index.search(query_vector, top_k, score_threshold))
         
         # Search in Qdrant
         try:
-            results = self.client.search(
+            results = self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_embedding,
-                limit=top_k
-            )
+                query=query_vector,
+                limit=top_k,
+                score_threshold=score_threshold,
+                search_params=self._search_params(top_k),
+                with_payload=True,
+                with_vectors=False
+            ).points
+            return self._format_results((point.payload, point.score) for point in results)
+        except Exception as e:
+            raise Exception(f"Failed to search vector store: {str(e)}")
+    
+    async def asearch(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        Search for similar documents without blocking the event loop.
+        
+        Args:
+            query: Search query text
+            top_k: Number of results to return
             
-            # Format results
-            formatted_results = []
-            for result in results:
-                formatted_results.append({
-                    "text": result.payload.get("text", ""),
-                    "metadata": {k: v for k, v in result.payload.items() if k != "text"},
-                    "score": result.score
-                })
+        Returns:
+            List of dictionaries containing text and metadata
+        """
+        query_embedding = await self.aembed_query(query)
+        return await self.asearch_by_vector(query_embedding, top_k=top_k)
+    
+    async def asearch_by_vector(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Search using a precomputed query embedding, without blocking the event loop.
+        
+        Args:
+            query_vector: Query embedding vector
+            top_k: Number of results to return
+            score_threshold: Optional minimum similarity score, applied by Qdrant
             
-            return formatted_results
+        Returns:
+            List of dictionaries containing text and metadata
+        """
+        query_vector = _unit_vectors([query_vector])[0]
+        local_index = self._local_index
+        if local_index is not None:
+            return self._format_results(local_index.search(query_vector, top_k, score_threshold))
+        
+        try:
+            client, _ = self._get_async_clients()
+            response = await client.query_points(
+                collection_name=self.collection_name,
+                query=query_vector,
+                limit=top_k,
+                score_threshold=score_threshold,
+                search_params=self._search_params(top_k),
+                with_payload=True,
+                with_vectors=False
+            )
+            return self._format_results((point.payload, point.score) for point in response.points)
         except Exception as e:
             raise Exception(f"Failed to search vector store: {str(e)}")
     
+    def _format_results(self, hits) -> List[Dict]:
+        """Convert (payload, score) pairs into result dictionaries."""
+        return [
+            {
+                "text": payload.get("text", ""),
+                "metadata": self._payload_metadata(payload),
+                "score": score
+            }
+            for payload, score in hits
+        ]
+    
+    @staticmethod
+    def _payload_metadata(payload: Dict) -> Dict:
+        """Return a copy of a point's metadata, accepting the older flat payload layout."""
+        # Copied so callers editing result metadata can't alter the local mirror's payloads
+        if "meta" in payload:
+            return dict(payload["meta"])
+        # Points written before metadata moved under "meta" kept it beside "text"
+        return {k: v for k, v in payload.items() if k != "text"}
+    
     def clear_collection(self):
         """Clear all documents from the collection."""
         try:
             self.client.delete_collection(self.collection_name)
+            self.revision += 1
             self._ensure_collection()
+            self._local_index = LocalIndex() if LOCAL_SEARCH_THRESHOLD > 0 else None
         except Exception as e:
             raise Exception(f"Failed to clear collection: {str(e)}")
 
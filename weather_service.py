@@ -1,19 +1,42 @@
 """Weather service for fetching real-time weather data from OpenWeatherMap API."""
+import threading
+import orjson
 import requests
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
 from typing import Dict, Optional
-from config import OPENWEATHERMAP_API_KEY
+from urllib3.util import Retry
+from config import OPENWEATHERMAP_API_KEY, WEATHER_CACHE_SIZE, WEATHER_CACHE_TTL
+
+
+def _build_session() -> requests.Session:
+    """Create a pooled HTTP session that retries transient failures with backoff."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=32,
+        max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
 class WeatherService:
     """Service to fetch weather data from OpenWeatherMap API."""
     
     BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+    # Shared by all instances so repeat calls reuse open connections
+    _session = _build_session()
     
     def __init__(self, api_key: Optional[str] = None):
         """Initialize WeatherService with API key."""
         self.api_key = api_key or OPENWEATHERMAP_API_KEY
         if not self.api_key:
             raise ValueError("OpenWeatherMap API key is required")
+        # Weather barely changes within minutes, so repeat lookups skip the API
+        self._cache = TTLCache(maxsize=WEATHER_CACHE_SIZE, ttl=WEATHER_CACHE_TTL)
+        self._cache_lock = threading.Lock()
     
     def get_weather(self, city: str, units: str = "metric") -> Dict:
         """
@@ -26,6 +49,31 @@ class WeatherService:
         Returns:
             Dictionary containing weather information
         """
+        key = (city.strip().lower(), units)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        weather = self._fetch_weather(city, units)
+        with self._cache_lock:
+            self._cache[key] = weather
+        return dict(weather)
+    
+    def invalidate(self, city: str):
+        """
+        Drop cached weather for a city in every unit system.
+        
+        Args:
+            city: Name of the city
+        """
+        name = city.strip().lower()
+        with self._cache_lock:
+            for key in [key for key in self._cache if key[0] == name]:
+                del self._cache[key]
+    
+    def _fetch_weather(self, city: str, units: str) -> Dict:
+        """Request current weather for a city from the API and parse it."""
         params = {
             "q": city,
             "appid": self.api_key,
@@ -33,9 +81,9 @@ class WeatherService:
         }
         
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            response = self._session.get(self.BASE_URL, params=params, timeout=10)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             return {
                 "city": data["name"],
@@ -51,7 +99,7 @@ class WeatherService:
             }
         except requests.exceptions.RequestException as e:
             raise Exception(f"Failed to fetch weather data: {str(e)}")
-        except KeyError as e:
+        except (KeyError, ValueError) as e:
             raise Exception(f"Unexpected API response format: {str(e)}")
     
     def format_weather_response(self, weather_data: Dict) -> str: